@@ -0,0 +1,82 @@
+import argparse
+import re
+import timeit
+import tiktoken
+from glossary import AcronymGlossary
+
+SAMPLE_QUERIES = [
+    "What are the SET exemptions for 2024/2025?",
+    "How is PAYE different from APIT?",
+    "WHT rate on dividends paid to non-residents",
+    "Is SVAT still applicable after VAT changes?",
+    "What is the corporate income tax rate?",
+    "How do I register for a TIN with the IRD?",
+    "Deadline for filing the annual return of income",
+    "ESC and NBT rates compared with VAT",
+]
+
+# Glossary block that REWRITE_PROMPT sent on every rewrite before it became query-dependent
+LEGACY_GLOSSARY_BLOCK = (
+    "IMPORTANT: If the question contains UPPERCASE words or acronyms (like SET, VAT, PAYE, WHT, etc.), "
+    "these are likely tax-related acronyms. Try to expand them to their full form if you know it:\n"
+    "- SET = Statement of Estimated Tax Payable\n"
+    "- VAT = Value Added Tax\n"
+    "- PAYE = Pay As You Earn\n"
+    "- WHT = Withholding Tax\n"
+    "- APIT = Advanced Personal Income Tax\n"
+    "- ESC = Economic Service Charge\n"
+    "- NBT = Nation Building Tax\n"
+    "- SVAT = Simplified Value Added Tax\n"
+    "- TIN = Tax Identification Number\n"
+    "\n"
+    "Include BOTH the acronym AND the full form in your improved question to ensure better search results.\n"
+    "For example: 'SET exemptions' should become 'Statement of Estimated Tax Payable (SET) exemptions'\n\n"
+)
+
+
+def legacy_expand(query: str, acronyms: dict) -> str:
+    """Previous implementation: two regexes built and run per acronym."""
+    expanded_query = query
+    for acronym, full_form in acronyms.items():
+        pattern = r'\b' + acronym + r'\b'
+        if re.search(pattern, query):
+            expanded_query = re.sub(pattern, f"{full_form} ({acronym})", expanded_query)
+    return expanded_query
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark acronym expansion and rewrite prompt size.")
+    parser.add_argument("--iterations", type=int, default=20_000)
+    args = parser.parse_args()
+
+    glossary = AcronymGlossary()
+    acronyms = dict(glossary.acronyms)
+
+    for query in SAMPLE_QUERIES:
+        if legacy_expand(query, acronyms) != glossary.expand(query):
+            print(f"Expansion differs for: {query}")
+
+    legacy = timeit.timeit(
+        lambda: [legacy_expand(query, acronyms) for query in SAMPLE_QUERIES], number=args.iterations
+    )
+    single_pass = timeit.timeit(
+        lambda: [glossary.expand(query) for query in SAMPLE_QUERIES], number=args.iterations
+    )
+    calls = args.iterations * len(SAMPLE_QUERIES)
+    print(f"Expansion per query: legacy {legacy / calls * 1e6:.2f}us, single pass {single_pass / calls * 1e6:.2f}us "
+          f"({legacy / single_pass:.1f}x)")
+
+    # cl100k_base is a proxy, Gemini's tokenizer counts differ slightly
+    encoding = tiktoken.get_encoding("cl100k_base")
+    legacy_tokens = len(encoding.encode(LEGACY_GLOSSARY_BLOCK))
+    print(f"\nRewrite prompt glossary tokens (legacy block: {legacy_tokens} on every call)")
+    total_saved = 0
+    for query in SAMPLE_QUERIES:
+        tokens = len(encoding.encode(glossary.prompt_section(query)))
+        total_saved += legacy_tokens - tokens
+        print(f"  {tokens:>4} tokens, saved {legacy_tokens - tokens:>4}: {query}")
+    print(f"Average saved per rewrite call: {total_saved / len(SAMPLE_QUERIES):.1f} tokens")
+
+
+if __name__ == "__main__":
+    main()
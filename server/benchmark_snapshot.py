@@ -0,0 +1,58 @@
+import argparse
+import tempfile
+import time
+from pathlib import Path
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from factories import ChromaVectorStore
+from services import SnapshotService
+
+
+def build_corpus(store: ChromaVectorStore, chunks: int, dimension: int, batch_size: int = 1000):
+    """Fill a collection with synthetic chunks and random embeddings."""
+    rng = np.random.default_rng(0)
+    for offset in range(0, chunks, batch_size):
+        count = min(batch_size, chunks - offset)
+        ids = [f"chunk-{offset + i}" for i in range(count)]
+        texts = [f"Synthetic tax guide chunk {offset + i}. " * 20 for i in range(count)]
+        metadatas = [{"source": "synthetic.pdf", "source_url": "", "page": (offset + i) // 10} for i in range(count)]
+        embeddings = rng.standard_normal((count, dimension), dtype=np.float32)
+        store.add_embeddings(ids, texts, metadatas, embeddings.tolist())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark snapshot export and import.")
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dimension", type=int, default=3072)
+    parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        workdir = Path(workdir)
+        # The embedding function is never called, snapshots carry their own vectors
+        embeddings = DeterministicFakeEmbedding(size=args.dimension)
+        source = ChromaVectorStore("benchmark_source", str(workdir / "source_db"), embeddings=embeddings)
+        target = ChromaVectorStore("benchmark_target", str(workdir / "target_db"), embeddings=embeddings)
+        
+        start = time.perf_counter()
+        build_corpus(source, args.chunks, args.dimension)
+        print(f"Corpus build: {args.chunks} chunks in {time.perf_counter() - start:.2f}s")
+        
+        snapshot_dir = workdir / "snapshot"
+        start = time.perf_counter()
+        SnapshotService(source).export_snapshot(str(snapshot_dir), dtype=args.dtype)
+        export_seconds = time.perf_counter() - start
+        size_mb = sum(f.stat().st_size for f in snapshot_dir.iterdir()) / 1024 / 1024
+        print(f"Snapshot export: {export_seconds:.2f}s, {size_mb:.1f} MB on disk")
+        
+        start = time.perf_counter()
+        np.load(snapshot_dir / SnapshotService.EMBEDDINGS_FILE, mmap_mode="r")
+        print(f"Snapshot mmap open: {(time.perf_counter() - start) * 1000:.2f}ms")
+        
+        start = time.perf_counter()
+        SnapshotService(target).import_snapshot(str(snapshot_dir))
+        print(f"Snapshot import: {time.perf_counter() - start:.2f}s ({target.count()} chunks)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import argparse
+import multiprocessing
+import resource
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from factories import ChromaVectorStore, NumpyVectorStore
+
+BACKENDS = ["chroma", "numpy-flat", "numpy-ivf"]
+
+
+def make_corpus(chunks: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, chunks // 200), dimension), dtype=np.float32)
+    corpus = centers[rng.integers(0, len(centers), chunks)]
+    corpus += 0.5 * rng.standard_normal((chunks, dimension), dtype=np.float32)
+    return corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+
+
+def make_queries(corpus: np.ndarray, queries: int, seed: int = 1) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    picked = corpus[rng.integers(0, len(corpus), queries)]
+    picked = picked + 0.3 * rng.standard_normal(picked.shape, dtype=np.float32) / np.sqrt(corpus.shape[1])
+    return picked / np.linalg.norm(picked, axis=1, keepdims=True)
+
+
+def rss_mb() -> float:
+    """Current resident set size, falling back to the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def open_store(backend: str, directory: str, dimension: int):
+    embeddings = DeterministicFakeEmbedding(size=dimension)
+    if backend == "chroma":
+        return ChromaVectorStore("benchmark", directory, embeddings=embeddings)
+    index_type = backend.split("-")[1]
+    return NumpyVectorStore("benchmark", directory, embeddings=embeddings, index_type=index_type)
+
+
+def build(backend: str, directory: str, chunks: int, dimension: int, batch_size: int = 1000) -> float:
+    store = open_store(backend, directory, dimension)
+    corpus = make_corpus(chunks, dimension)
+    start = time.perf_counter()
+    for offset in range(0, chunks, batch_size):
+        rows = corpus[offset:offset + batch_size]
+        ids = [str(offset + i) for i in range(len(rows))]
+        store.add_embeddings(ids, [f"chunk {i}" for i in ids], [{"row": int(i)} for i in ids], rows.tolist())
+    return time.perf_counter() - start
+
+
+def query(backend: str, directory: str, queries: np.ndarray, dimension: int, k: int) -> dict:
+    baseline_rss = rss_mb()
+    store = open_store(backend, directory, dimension)
+
+    # First query pays for lazy work (IVF training, page faults)
+    start = time.perf_counter()
+    store.batch_search(queries[:1].tolist(), k)
+    warmup = time.perf_counter() - start
+
+    latencies, results = [], []
+    for q in queries:
+        start = time.perf_counter()
+        docs = store.batch_search([q.tolist()], k)[0]
+        latencies.append(time.perf_counter() - start)
+        results.append([int(doc.id) for doc in docs])
+
+    start = time.perf_counter()
+    store.batch_search(queries.tolist(), k)
+    batch_seconds = time.perf_counter() - start
+
+    return {
+        "results": results,
+        "warmup_ms": warmup * 1000,
+        "p50_ms": float(np.percentile(latencies, 50)) * 1000,
+        "p95_ms": float(np.percentile(latencies, 95)) * 1000,
+        "batch_ms": batch_seconds * 1000,
+        "rss_mb": rss_mb() - baseline_rss,
+    }
+
+
+def run_isolated(function, *args):
+    """Run in a fresh process so RSS reflects only that backend."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+        return executor.submit(function, *args).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the numpy vector store against Chroma.")
+    parser.add_argument("--chunks", type=int, default=100_000)
+    parser.add_argument("--dimension", type=int, default=3072)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=6)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=BACKENDS)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.chunks, args.dimension)
+    queries = make_queries(corpus, args.queries)
+    exact = np.argsort(-(queries @ corpus.T), axis=1)[:, :args.k]
+    del corpus
+
+    print(f"{args.chunks} chunks, dimension {args.dimension}, {args.queries} queries, k={args.k}\n")
+    print(f"{'backend':<12}{'build s':>10}{'recall':>9}{'warmup ms':>11}{'p50 ms':>9}{'p95 ms':>9}{'batch ms':>10}{'RSS MB':>9}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        for backend in args.backends:
+            directory = str(Path(workdir) / backend)
+            build_seconds = run_isolated(build, backend, directory, args.chunks, args.dimension)
+            stats = run_isolated(query, backend, directory, queries, args.dimension, args.k)
+            recall = np.mean([
+                len(set(found) & set(expected)) / args.k
+                for found, expected in zip(stats["results"], exact.tolist())
+            ])
+            print(
+                f"{backend:<12}{build_seconds:>10.2f}{recall:>9.3f}{stats['warmup_ms']:>11.1f}"
+                f"{stats['p50_ms']:>9.2f}{stats['p95_ms']:>9.2f}{stats['batch_ms']:>10.1f}{stats['rss_mb']:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
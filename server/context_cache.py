@@ -0,0 +1,167 @@
+from collections import OrderedDict
+import os
+from threading import Lock
+from typing import Dict, List, Optional
+import numpy as np
+
+_context_cache = None
+
+
+class ThreadContext:
+    """Recently retrieved chunks for a single conversation thread."""
+
+    def __init__(self):
+        self.chunk_ids: List[str] = []
+        self.chunks: List[str] = []
+        self.embeddings = np.empty((0, 0), dtype=np.float32)
+
+
+class ThreadContextCache:
+    """
+    Per-thread store of retrieved chunk ids and embeddings.
+
+    Chunks are only committed to a thread once the grader accepted them, so a
+    follow-up question can be answered from them without another retrieve +
+    grade round trip. Embeddings are kept L2-normalised so a lookup is a
+    single matrix-vector product.
+    """
+
+    def __init__(
+        self,
+        similarity_threshold: float = 0.75,
+        min_matches: int = 2,
+        enabled: bool = True,
+        top_k: int = 6,
+        max_chunks_per_thread: int = 24,
+        max_threads: int = 256
+    ):
+        self.similarity_threshold = similarity_threshold
+        self.min_matches = min_matches
+        self.enabled = enabled
+        self.top_k = top_k
+        self.max_chunks_per_thread = max_chunks_per_thread
+        self.max_threads = max_threads
+        self._threads: "OrderedDict[str, ThreadContext]" = OrderedDict()
+        self._pending: Dict[str, tuple] = {}
+        self._lock = Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        matrix = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def lookup(self, thread_id: Optional[str], query_embedding: List[float]) -> Optional[str]:
+        """Return cached context for the query, or None if it is not similar enough."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            context = self._threads.get(thread_id) if thread_id else None
+            if context is None or not context.chunk_ids:
+                self.misses += 1
+                return None
+
+            query = self._normalize(query_embedding)[0]
+            if query.shape[0] != context.embeddings.shape[1]:
+                self.misses += 1
+                return None
+
+            scores = context.embeddings @ query
+            order = np.argsort(scores)[::-1][:self.top_k]
+            matched = [i for i in order if scores[i] >= self.similarity_threshold]
+
+            if len(matched) < self.min_matches:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._threads.move_to_end(thread_id)
+            return "".join(context.chunks[i] for i in matched)
+
+    def stage(self, thread_id: Optional[str], chunk_ids: List[str], embeddings: List, chunks: List[str]) -> None:
+        """Hold freshly retrieved chunks until the grader decides on them."""
+        if not self.enabled or not thread_id or not chunk_ids:
+            return
+        with self._lock:
+            self._pending[thread_id] = (
+                self._generation, list(chunk_ids), self._normalize(embeddings), list(chunks)
+            )
+
+    def commit(self, thread_id: Optional[str]) -> None:
+        """Move the staged chunks of a thread into its cached context."""
+        with self._lock:
+            staged = self._pending.pop(thread_id, None) if thread_id else None
+            if staged is None:
+                return
+            generation, chunk_ids, embeddings, chunks = staged
+            # Retrieved before the corpus changed, may no longer match it
+            if generation != self._generation:
+                return
+
+            context = self._threads.get(thread_id)
+            if context is None:
+                context = ThreadContext()
+                self._threads[thread_id] = context
+            self._threads.move_to_end(thread_id)
+
+            # Newer copies of a chunk replace older ones
+            new_ids = set(chunk_ids)
+            keep = [i for i, chunk_id in enumerate(context.chunk_ids) if chunk_id not in new_ids]
+            context.chunk_ids = [context.chunk_ids[i] for i in keep] + chunk_ids
+            context.chunks = [context.chunks[i] for i in keep] + chunks
+            if context.embeddings.size and context.embeddings.shape[1] == embeddings.shape[1]:
+                context.embeddings = np.vstack([context.embeddings[keep], embeddings])
+            else:
+                context.chunk_ids, context.chunks = chunk_ids, chunks
+                context.embeddings = embeddings
+
+            # Only the most recently retrieved chunks are kept per thread
+            overflow = len(context.chunk_ids) - self.max_chunks_per_thread
+            if overflow > 0:
+                context.chunk_ids = context.chunk_ids[overflow:]
+                context.chunks = context.chunks[overflow:]
+                context.embeddings = context.embeddings[overflow:]
+
+            while len(self._threads) > self.max_threads:
+                self._threads.popitem(last=False)
+
+    def discard(self, thread_id: Optional[str]) -> None:
+        """Drop staged chunks that the grader rejected."""
+        with self._lock:
+            if thread_id:
+                self._pending.pop(thread_id, None)
+
+    def clear(self) -> None:
+        """Forget all cached and staged chunks, e.g. after the corpus changed."""
+        with self._lock:
+            self._threads.clear()
+            self._pending.clear()
+            self._generation += 1
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "enabled": self.enabled,
+                "threads": len(self._threads),
+                "cached_chunks": sum(len(c.chunk_ids) for c in self._threads.values()),
+            }
+
+
+def get_context_cache() -> ThreadContextCache:
+    global _context_cache
+    if _context_cache is None:
+        # The hit policy decides when grading is skipped, so it is tunable without code changes
+        _context_cache = ThreadContextCache(
+            similarity_threshold=float(os.getenv("CONTEXT_CACHE_THRESHOLD", "0.75")),
+            min_matches=int(os.getenv("CONTEXT_CACHE_MIN_MATCHES", "2")),
+            enabled=os.getenv("CONTEXT_CACHE_ENABLED", "true").lower() == "true"
+        )
+    return _context_cache
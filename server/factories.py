@@ -1,10 +1,18 @@
 from abc import ABC, abstractmethod
+from pathlib import Path
+from threading import Lock
 from langchain_community.document_loaders import PyMuPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_chroma import Chroma
+from langchain_core.documents import Document
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
-from typing import List
+from typing import Dict, List, Optional, Tuple
+import json
+import os
+import uuid
+import numpy as np
 from interfaces import DocumentLoader, TextSplitter, VectorStore
+from context_cache import get_context_cache
 from dotenv import load_dotenv
 
 class DocumentLoaderFactory:
@@ -27,9 +35,11 @@ class TextSplitterFactory:
 
 class VectorStoreFactory:
     @staticmethod
-    def create_vector_store(store_type: str, collection_name: str, persist_directory: str) -> VectorStore:
+    def create_vector_store(store_type: str, collection_name: str, persist_directory: str, **options) -> VectorStore:
         if store_type == "chroma":
-            return ChromaVectorStore(collection_name, persist_directory)
+            return ChromaVectorStore(collection_name, persist_directory, **options)
+        if store_type == "numpy":
+            return NumpyVectorStore(collection_name, persist_directory, **options)
         raise ValueError(f"Unsupported vector store type: {store_type}")
 
 class EmbeddingFactory:
@@ -59,13 +69,487 @@ class TikTokenTextSplitter(TextSplitter):
         return self.splitter.split_documents(documents)
 
 class ChromaVectorStore(VectorStore):
-    def __init__(self, collection_name: str, persist_directory: str):
-        embeddings = EmbeddingFactory.create_embedding("google", "models/gemini-embedding-001")
+    embedding_model = "models/gemini-embedding-001"
+
+    def __init__(self, collection_name: str, persist_directory: str, embeddings=None):
+        self.embeddings = embeddings or EmbeddingFactory.create_embedding("google", self.embedding_model)
         self.store = Chroma(
             collection_name=collection_name,
-            embedding_function=embeddings,
+            embedding_function=self.embeddings,
             persist_directory=persist_directory
         )
     
     def add_documents(self, documents: List) -> None:
         self.store.add_documents(documents)
+
+    def embed_query(self, query: str) -> List[float]:
+        return self.embeddings.embed_query(query)
+
+    def similarity_search(self, query: str, k: int) -> List:
+        return self.store.similarity_search(query, k=k)
+
+    def batch_search(self, query_embeddings: List[List[float]], k: int) -> List[List]:
+        result = self.store._collection.query(
+            query_embeddings=query_embeddings, n_results=k, include=["documents", "metadatas"]
+        )
+        return [
+            [
+                Document(page_content=text, metadata=metadata or {}, id=chunk_id)
+                for chunk_id, text, metadata in zip(ids, texts, metadatas)
+            ]
+            for ids, texts, metadatas in zip(result["ids"], result["documents"], result["metadatas"])
+        ]
+
+    def delete(self, ids: List[str]) -> None:
+        self.store.delete(ids=ids)
+        get_context_cache().clear()
+
+    def search_with_embeddings(self, query_embedding: List[float], k: int) -> Tuple[List, List]:
+        # One query returns the stored embeddings too, no extra round trip or embedding calls
+        result = self.store._collection.query(
+            query_embeddings=[query_embedding], n_results=k, include=["documents", "metadatas", "embeddings"]
+        )
+        docs = [
+            Document(page_content=text, metadata=metadata or {}, id=chunk_id)
+            for chunk_id, text, metadata in zip(result["ids"][0], result["documents"][0], result["metadatas"][0])
+        ]
+        return docs, list(result["embeddings"][0])
+
+    def count(self) -> int:
+        return self.store._collection.count()
+
+    def get_batch(self, offset: int, limit: int) -> Tuple[List, List, List, List]:
+        result = self.store.get(limit=limit, offset=offset, include=["documents", "metadatas", "embeddings"])
+        return result["ids"], result["documents"], result["metadatas"], result["embeddings"]
+
+    def add_embeddings(self, ids: List[str], texts: List[str], metadatas: List[Dict], embeddings: List) -> None:
+        # Chroma rejects empty metadata dicts
+        metadatas = [metadata or None for metadata in metadatas]
+        self.store._collection.upsert(ids=ids, documents=texts, metadatas=metadatas, embeddings=embeddings)
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-process vector store backed by a memory-mapped float32 matrix.
+
+    Rows are L2-normalised, so cosine similarity is a dot product and a batch
+    of queries is one matrix multiply. Files live in
+    `<persist_directory>/<collection_name>/` and are append-only:
+    `embeddings.<generation>.f32` (raw rows), `chunks.<generation>.jsonl`
+    (id, text, metadata per row) and `deleted.<generation>.jsonl` (tombstoned
+    row numbers). A torn write is cut back to the last complete row on load.
+    Dead rows are compacted away once they outnumber live ones; compaction
+    writes a new generation and switches to it by replacing `manifest.json`.
+
+    With `index_type="ivf"` an inverted-file index (k-means centroids) is built
+    lazily once the store holds `ivf_min_rows` rows, and queries only scan the
+    `nprobe` closest lists. It is retrained once the live rows grow past
+    `ivf_retrain_factor` times the rows it was trained on. Smaller stores
+    always use exact search.
+    """
+
+    embedding_model = "models/gemini-embedding-001"
+    FORMAT_VERSION = 2
+
+    def __init__(
+        self,
+        collection_name: str,
+        persist_directory: str,
+        embeddings=None,
+        index_type: str = "flat",
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        ivf_min_rows: int = 10_000,
+        ivf_retrain_factor: float = 2.0
+    ):
+        if index_type not in ("flat", "ivf"):
+            raise ValueError(f"Unsupported index type: {index_type}")
+        self.embeddings = embeddings or EmbeddingFactory.create_embedding("google", self.embedding_model)
+        self.index_type = index_type
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.ivf_min_rows = ivf_min_rows
+        self.ivf_retrain_factor = ivf_retrain_factor
+        self.directory = Path(persist_directory) / collection_name
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = Lock()
+        self._load()
+
+    # ---------- persistence ----------
+
+    def _embeddings_path(self, generation: int = None) -> Path:
+        return self.directory / f"embeddings.{self._generation if generation is None else generation}.f32"
+
+    def _chunks_path(self, generation: int = None) -> Path:
+        return self.directory / f"chunks.{self._generation if generation is None else generation}.jsonl"
+
+    def _deleted_path(self, generation: int = None) -> Path:
+        return self.directory / f"deleted.{self._generation if generation is None else generation}.jsonl"
+
+    @property
+    def _manifest_path(self) -> Path:
+        return self.directory / "manifest.json"
+
+    @staticmethod
+    def _read_lines(path: Path) -> List[bytes]:
+        """Newline-terminated lines of a file, cutting off a torn trailing line."""
+        if not path.exists():
+            return []
+        with open(path, "rb") as line_file:
+            data = line_file.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            os.truncate(path, end)
+        return data[:end].splitlines(keepends=True)
+
+    def _load(self) -> None:
+        self.dimension = 0
+        self._generation = 0
+        if self._manifest_path.exists():
+            with open(self._manifest_path, "r", encoding="utf-8") as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest.get("format_version") != self.FORMAT_VERSION:
+                raise ValueError(f"Unsupported numpy store format version: {manifest.get('format_version')}")
+            self.dimension = manifest["dimension"]
+            self._generation = manifest["generation"]
+        self._remove_stale_generations()
+
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[Dict] = []
+        chunks_size = 0
+        for line in self._read_lines(self._chunks_path()):
+            try:
+                chunk = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            self._ids.append(chunk["id"])
+            self._texts.append(chunk["text"])
+            self._metadatas.append(chunk["metadata"])
+            chunks_size += len(line)
+
+        # A write interrupted between the two files leaves extra rows in one of
+        # them; cut both back so later appends line up again
+        row_size = 4 * self.dimension
+        embeddings_path = self._embeddings_path()
+        embedding_rows = embeddings_path.stat().st_size // row_size if row_size and embeddings_path.exists() else 0
+        rows = min(embedding_rows, len(self._ids))
+        if embeddings_path.exists() and embeddings_path.stat().st_size != rows * row_size:
+            os.truncate(embeddings_path, rows * row_size)
+        if rows < len(self._ids):
+            chunks_size = sum(len(line) for line in self._read_lines(self._chunks_path())[:rows])
+            del self._ids[rows:], self._texts[rows:], self._metadatas[rows:]
+        if self._chunks_path().exists() and self._chunks_path().stat().st_size != chunks_size:
+            os.truncate(self._chunks_path(), chunks_size)
+
+        self._alive = np.ones(rows, dtype=bool)
+        deleted = [int(line) for line in self._read_lines(self._deleted_path()) if line.strip()]
+        self._alive[[row for row in deleted if row < rows]] = False
+
+        # An upsert interrupted before its tombstone leaves an older live copy
+        self._row_by_id = {}
+        stale = []
+        for row, chunk_id in enumerate(self._ids):
+            if not self._alive[row]:
+                continue
+            if chunk_id in self._row_by_id:
+                stale.append(self._row_by_id[chunk_id])
+            self._row_by_id[chunk_id] = row
+        self._append_tombstones(stale)
+
+        self._remap(rows)
+        self._centroids = None
+        self._trained_rows = 0
+        self._lists: List[np.ndarray] = []
+
+    def _remove_stale_generations(self) -> None:
+        """Delete files of generations other than the one the manifest points to."""
+        current = {self._embeddings_path().name, self._chunks_path().name, self._deleted_path().name}
+        for pattern in ("embeddings.*.f32", "chunks.*.jsonl", "deleted.*.jsonl", "*.tmp"):
+            for path in self.directory.glob(pattern):
+                if path.name not in current:
+                    try:
+                        path.unlink(missing_ok=True)
+                    except OSError:
+                        # Still mapped elsewhere (Windows), removed on the next load
+                        pass
+
+    def _remap(self, rows: int) -> None:
+        if rows == 0:
+            self._matrix = np.empty((0, self.dimension), dtype=np.float32)
+        else:
+            self._matrix = np.memmap(self._embeddings_path(), dtype=np.float32, mode="r", shape=(rows, self.dimension))
+
+    def _write_manifest(self, generation: int) -> None:
+        manifest = {
+            "format_version": self.FORMAT_VERSION,
+            "embedding_model": self.embedding_model,
+            "dimension": self.dimension,
+            "generation": generation,
+        }
+        temp_path = self._manifest_path.with_suffix(".json.tmp")
+        with open(temp_path, "w", encoding="utf-8") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+            manifest_file.flush()
+            os.fsync(manifest_file.fileno())
+        os.replace(temp_path, self._manifest_path)
+
+    def _append_tombstones(self, rows: List[int]) -> None:
+        if not rows:
+            return
+        with open(self._deleted_path(), "a", encoding="utf-8") as deleted_file:
+            deleted_file.writelines(f"{row}\n" for row in rows)
+        self._alive[rows] = False
+
+    def _compact(self) -> None:
+        """Write the live rows as a new generation, switch to it and drop the IVF index."""
+        live = np.flatnonzero(self._alive)
+        matrix = np.ascontiguousarray(self._matrix[live])
+        ids = [self._ids[row] for row in live]
+        texts = [self._texts[row] for row in live]
+        metadatas = [self._metadatas[row] for row in live]
+
+        # The old files stay untouched (and safely mapped) until the manifest
+        # points at the new generation, so a crash leaves one consistent set
+        generation = self._generation + 1
+        with open(self._embeddings_path(generation), "wb") as embeddings_file:
+            embeddings_file.write(matrix.tobytes())
+            embeddings_file.flush()
+            os.fsync(embeddings_file.fileno())
+        with open(self._chunks_path(generation), "w", encoding="utf-8") as chunks_file:
+            for chunk_id, text, metadata in zip(ids, texts, metadatas):
+                chunks_file.write(json.dumps({"id": chunk_id, "text": text, "metadata": metadata}) + "\n")
+            chunks_file.flush()
+            os.fsync(chunks_file.fileno())
+        self._write_manifest(generation)
+        self._generation = generation
+
+        self._ids, self._texts, self._metadatas = ids, texts, metadatas
+        self._alive = np.ones(len(ids), dtype=bool)
+        self._row_by_id = {chunk_id: row for row, chunk_id in enumerate(ids)}
+        self._remap(len(ids))
+        self._centroids = None
+        self._trained_rows = 0
+        self._lists = []
+        self._remove_stale_generations()
+
+    # ---------- writes ----------
+
+    def add_documents(self, documents: List) -> None:
+        if not documents:
+            return
+        texts = [doc.page_content for doc in documents]
+        ids = [doc.id or str(uuid.uuid4()) for doc in documents]
+        embeddings = self.embeddings.embed_documents(texts)
+        self.add_embeddings(ids, texts, [doc.metadata for doc in documents], embeddings)
+
+    def add_embeddings(self, ids: List[str], texts: List[str], metadatas: List[Dict], embeddings: List) -> None:
+        if not ids:
+            return
+        vectors = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        vectors = vectors / norms
+
+        # An id repeated within the batch keeps only its last occurrence
+        last_index = {chunk_id: i for i, chunk_id in enumerate(ids)}
+        if len(last_index) < len(ids):
+            keep = sorted(last_index.values())
+            ids = [ids[i] for i in keep]
+            texts = [texts[i] for i in keep]
+            metadatas = [metadatas[i] for i in keep]
+            vectors = vectors[keep]
+
+        # Serialise everything up front so a bad metadata value fails before either file is touched
+        chunk_lines = "".join(
+            json.dumps({"id": chunk_id, "text": text, "metadata": metadata or {}}) + "\n"
+            for chunk_id, text, metadata in zip(ids, texts, metadatas)
+        ).encode("utf-8")
+        vector_bytes = vectors.tobytes()
+
+        with self._lock:
+            if self.dimension == 0:
+                self.dimension = vectors.shape[1]
+                self._write_manifest(self._generation)
+            elif vectors.shape[1] != self.dimension:
+                raise ValueError(f"Expected embeddings of dimension {self.dimension}, got {vectors.shape[1]}")
+
+            start = len(self._ids)
+            embeddings_path, chunks_path = self._embeddings_path(), self._chunks_path()
+            embeddings_size = embeddings_path.stat().st_size if embeddings_path.exists() else 0
+            chunks_size = chunks_path.stat().st_size if chunks_path.exists() else 0
+            try:
+                with open(embeddings_path, "ab") as embeddings_file:
+                    embeddings_file.write(vector_bytes)
+                with open(chunks_path, "ab") as chunks_file:
+                    chunks_file.write(chunk_lines)
+            except BaseException:
+                # Roll both files back so later rows stay paired with their ids
+                for path, size in ((embeddings_path, embeddings_size), (chunks_path, chunks_size)):
+                    if path.exists():
+                        os.truncate(path, size)
+                raise
+
+            # Upserts tombstone the previous row for the same id, after the new row is on disk
+            replaced = [self._row_by_id[chunk_id] for chunk_id in ids if chunk_id in self._row_by_id]
+
+            self._ids.extend(ids)
+            self._texts.extend(texts)
+            self._metadatas.extend(metadata or {} for metadata in metadatas)
+            self._alive = np.concatenate([self._alive, np.ones(len(ids), dtype=bool)])
+            self._append_tombstones(replaced)
+            self._row_by_id.update((chunk_id, start + i) for i, chunk_id in enumerate(ids))
+            self._remap(len(self._ids))
+
+            if self._centroids is not None:
+                self._assign_to_lists(np.arange(start, len(self._ids)), vectors)
+
+    def delete(self, ids: List[str]) -> None:
+        with self._lock:
+            rows = [self._row_by_id.pop(chunk_id) for chunk_id in ids if chunk_id in self._row_by_id]
+            self._append_tombstones(rows)
+            if len(self._alive) and (~self._alive).sum() > self._alive.sum():
+                self._compact()
+        get_context_cache().clear()
+
+    # ---------- IVF index ----------
+
+    def _build_ivf(self) -> None:
+        live = np.flatnonzero(self._alive)
+        nlist = min(self.nlist or max(1, int(np.sqrt(len(live)))), len(live))
+        rng = np.random.default_rng(0)
+        sample = live[rng.choice(len(live), size=min(len(live), nlist * 64), replace=False)]
+        train = np.asarray(self._matrix[np.sort(sample)])
+
+        # Spherical k-means on a sample, rows are already unit length
+        centroids = train[rng.choice(len(train), size=nlist, replace=False)]
+        for _ in range(10):
+            assignment = np.argmax(train @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = train[assignment == c]
+                if len(members):
+                    centroid = members.sum(axis=0)
+                    centroids[c] = centroid / (np.linalg.norm(centroid) or 1.0)
+
+        lists = [np.empty(0, dtype=np.int64) for _ in range(nlist)]
+        for start in range(0, len(live), 8192):
+            rows = live[start:start + 8192]
+            assignment = np.argmax(np.asarray(self._matrix[rows]) @ centroids.T, axis=1)
+            for c in np.unique(assignment):
+                lists[c] = np.concatenate([lists[c], rows[assignment == c]])
+
+        self._centroids, self._lists = centroids, lists
+        self._trained_rows = len(live)
+
+    def _assign_to_lists(self, rows: np.ndarray, vectors: np.ndarray) -> None:
+        assignment = np.argmax(vectors @ self._centroids.T, axis=1)
+        # Readers may hold the previous lists, so swap in a new container
+        lists = list(self._lists)
+        for c in np.unique(assignment):
+            lists[c] = np.concatenate([lists[c], rows[assignment == c]])
+        self._lists = lists
+
+    def _needs_ivf_training(self) -> bool:
+        if self._centroids is None:
+            return True
+        # Lists grow as rows are appended; retrain so nlist and the centroids keep up
+        return int(self._alive.sum()) > self._trained_rows * self.ivf_retrain_factor
+
+    def _use_ivf(self) -> bool:
+        if self.index_type != "ivf" or int(self._alive.sum()) < self.ivf_min_rows:
+            return False
+        if self._needs_ivf_training():
+            with self._lock:
+                if self._needs_ivf_training():
+                    self._build_ivf()
+        return True
+
+    # ---------- reads ----------
+
+    def _snapshot(self) -> Tuple:
+        """
+        Consistent view of the store for one read.
+
+        Appends only extend these objects and compaction replaces them, so row
+        numbers found in a snapshot stay valid for its lists and matrix.
+        """
+        with self._lock:
+            return (
+                self._matrix, self._alive, self._centroids, self._lists,
+                self._ids, self._texts, self._metadatas
+            )
+
+    def _normalize_queries(self, query_embeddings) -> np.ndarray:
+        queries = np.atleast_2d(np.asarray(query_embeddings, dtype=np.float32))
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return queries / norms
+
+    @staticmethod
+    def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+        if len(scores) > k:
+            candidates = np.argpartition(-scores, k)[:k]
+        else:
+            candidates = np.arange(len(scores))
+        return candidates[np.argsort(-scores[candidates])]
+
+    def _search_rows(self, queries: np.ndarray, k: int, snapshot: Tuple) -> List[np.ndarray]:
+        matrix, alive, centroids, lists = snapshot[:4]
+        if len(matrix) == 0:
+            return [np.empty(0, dtype=np.int64) for _ in queries]
+
+        if centroids is not None:
+            results = []
+            centroid_scores = queries @ centroids.T
+            for query, scores in zip(queries, centroid_scores):
+                probes = self._top_k(scores, self.nprobe)
+                rows = np.concatenate([lists[c] for c in probes])
+                rows = rows[alive[rows]]
+                results.append(rows[self._top_k(np.asarray(matrix[rows]) @ query, k)])
+            return results
+
+        alive = alive[:len(matrix)]
+        scores = queries @ matrix.T
+        scores[:, ~alive] = -np.inf
+        k = min(k, int(alive.sum()))
+        return [self._top_k(row_scores, k) for row_scores in scores]
+
+    def _search(self, query_embeddings, k: int) -> Tuple[Tuple, List[np.ndarray]]:
+        queries = self._normalize_queries(query_embeddings)
+        use_ivf = self._use_ivf()
+        snapshot = self._snapshot()
+        if not use_ivf:
+            snapshot = snapshot[:2] + (None, None) + snapshot[4:]
+        return snapshot, self._search_rows(queries, k, snapshot)
+
+    @staticmethod
+    def _document(snapshot: Tuple, row: int) -> Document:
+        ids, texts, metadatas = snapshot[4:]
+        return Document(page_content=texts[row], metadata=metadatas[row], id=ids[row])
+
+    def embed_query(self, query: str) -> List[float]:
+        return self.embeddings.embed_query(query)
+
+    def similarity_search(self, query: str, k: int) -> List:
+        return self.batch_search([self.embed_query(query)], k)[0]
+
+    def batch_search(self, query_embeddings: List[List[float]], k: int) -> List[List]:
+        snapshot, rows = self._search(query_embeddings, k)
+        return [[self._document(snapshot, row) for row in query_rows] for query_rows in rows]
+
+    def search_with_embeddings(self, query_embedding: List[float], k: int) -> Tuple[List, List]:
+        snapshot, rows = self._search(query_embedding, k)
+        matrix = snapshot[0]
+        return [self._document(snapshot, row) for row in rows[0]], [np.asarray(matrix[row]) for row in rows[0]]
+
+    def count(self) -> int:
+        return int(self._alive.sum())
+
+    def get_batch(self, offset: int, limit: int) -> Tuple[List, List, List, List]:
+        matrix, alive, _, _, ids, texts, metadatas = self._snapshot()
+        rows = np.flatnonzero(alive[:len(matrix)])[offset:offset + limit]
+        return (
+            [ids[row] for row in rows],
+            [texts[row] for row in rows],
+            [metadatas[row] for row in rows],
+            np.asarray(matrix[rows])
+        )
@@ -0,0 +1,131 @@
+from pathlib import Path
+from threading import Lock
+from typing import Dict, List, Optional
+import json
+import os
+import re
+
+DEFAULT_GLOSSARY_PATH = Path(__file__).parent / "tax_glossary.json"
+DEFAULT_MINED_GLOSSARY_PATH = "./mined_glossary.json"
+
+# "Value Added Tax (VAT)": capitalised words, optionally joined by short connectors
+FULL_FORM_PATTERN = re.compile(
+    r"((?:[A-Z][A-Za-z]+\s+(?:(?:of|and|for|the|on|in)\s+)?){1,8})\(([A-Z]{2,6})\)"
+)
+CONNECTORS = {"of", "and", "for", "the", "on", "in"}
+# Two-letter definitions such as "Income Tax (IT)" would rewrite every later "IT"
+MIN_MINED_ACRONYM_LENGTH = 3
+UPPERCASE_WORD_PATTERN = re.compile(r"\b[A-Z]{2,6}\b")
+
+_glossary = None
+
+
+class AcronymGlossary:
+    """
+    Tax acronym glossary with a single precompiled alternation pattern.
+
+    Configured entries come from a JSON file and always win over entries
+    mined from ingested documents. The pattern is rebuilt only when the
+    glossary changes, so expanding a query is one regex pass.
+    """
+
+    def __init__(self, config_path: str = None, mined_path: Optional[str] = None):
+        self.config_path = Path(config_path or DEFAULT_GLOSSARY_PATH)
+        self.mined_path = Path(mined_path) if mined_path else None
+        self._lock = Lock()
+        
+        with open(self.config_path, "r", encoding="utf-8") as config_file:
+            self.configured: Dict[str, str] = json.load(config_file)
+        
+        self.mined: Dict[str, str] = {}
+        if self.mined_path and self.mined_path.exists():
+            with open(self.mined_path, "r", encoding="utf-8") as mined_file:
+                self.mined = json.load(mined_file)
+        
+        self._compile()
+
+    def _compile(self) -> None:
+        self.acronyms = {**self.mined, **self.configured}
+        # Longest first so SVAT is preferred over VAT at the same position
+        alternation = "|".join(re.escape(acronym) for acronym in sorted(self.acronyms, key=len, reverse=True))
+        self.pattern = re.compile(rf"\b(?:{alternation})\b") if alternation else None
+
+    def find(self, query: str) -> List[str]:
+        """Acronyms present in the query, in order of first appearance."""
+        if self.pattern is None:
+            return []
+        return list(dict.fromkeys(self.pattern.findall(query)))
+
+    def expand(self, query: str) -> str:
+        """Replace each acronym with "Full Form (ACRONYM)" in a single pass."""
+        if self.pattern is None:
+            return query
+        acronyms = self.acronyms
+        return self.pattern.sub(lambda match: f"{acronyms[match.group(0)]} ({match.group(0)})", query)
+
+    def prompt_section(self, query: str) -> str:
+        """Acronym instructions for the rewrite prompt, or an empty string if the query has no uppercase words."""
+        if not UPPERCASE_WORD_PATTERN.search(query):
+            return ""
+        lines = "".join(f"- {acronym} = {self.acronyms[acronym]}\n" for acronym in self.find(query))
+        known = f"Known full forms:\n{lines}" if lines else ""
+        return (
+            "IMPORTANT: If the question contains UPPERCASE words or acronyms, "
+            "these are likely tax-related acronyms. Try to expand them to their full form if you know it.\n"
+            f"{known}"
+            "\n"
+            "Include BOTH the acronym AND the full form in your improved question to ensure better search results.\n"
+            "For example: 'SET exemptions' should become 'Statement of Estimated Tax Payable (SET) exemptions'\n\n"
+        )
+
+    @staticmethod
+    def mine(text: str) -> Dict[str, str]:
+        """Find "Full Form (ACR)" definitions whose word initials spell the acronym."""
+        found = {}
+        for match in FULL_FORM_PATTERN.finditer(text):
+            words = match.group(1).split()
+            acronym = match.group(2)
+            if len(acronym) < MIN_MINED_ACRONYM_LENGTH:
+                continue
+            # Shortest trailing run of words whose capitalised initials spell the acronym
+            for start in range(len(words) - 1, -1, -1):
+                candidate = words[start:]
+                if candidate[0].lower() in CONNECTORS:
+                    continue
+                initials = "".join(word[0] for word in candidate if word.lower() not in CONNECTORS)
+                if initials == acronym:
+                    found.setdefault(acronym, " ".join(candidate))
+                    break
+                if len(initials) >= len(acronym):
+                    break
+        return found
+
+    def mine_documents(self, documents: List) -> int:
+        """Add acronyms defined in the documents that the glossary does not know yet."""
+        mined = {}
+        for doc in documents:
+            for acronym, full_form in self.mine(doc.page_content).items():
+                if acronym not in self.acronyms:
+                    mined.setdefault(acronym, full_form)
+        
+        if not mined:
+            return 0
+        
+        with self._lock:
+            self.mined.update(mined)
+            self._compile()
+            if self.mined_path:
+                with open(self.mined_path, "w", encoding="utf-8") as mined_file:
+                    json.dump(self.mined, mined_file, indent=2)
+        
+        return len(mined)
+
+
+def get_glossary() -> AcronymGlossary:
+    global _glossary
+    if _glossary is None:
+        _glossary = AcronymGlossary(
+            os.getenv("TAX_GLOSSARY_PATH"),
+            os.getenv("MINED_GLOSSARY_PATH", DEFAULT_MINED_GLOSSARY_PATH)
+        )
+    return _glossary
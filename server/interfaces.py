@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Protocol, Dict, List
+from typing import Protocol, Dict, List, Tuple
 from pathlib import Path
 
 class DocumentLoader(ABC):
@@ -17,6 +17,38 @@ class VectorStore(ABC):
     def add_documents(self, documents: List) -> None:
         pass
 
+    @abstractmethod
+    def embed_query(self, query: str) -> List[float]:
+        pass
+
+    @abstractmethod
+    def similarity_search(self, query: str, k: int) -> List:
+        pass
+
+    @abstractmethod
+    def batch_search(self, query_embeddings: List[List[float]], k: int) -> List[List]:
+        pass
+
+    @abstractmethod
+    def delete(self, ids: List[str]) -> None:
+        pass
+
+    @abstractmethod
+    def search_with_embeddings(self, query_embedding: List[float], k: int) -> Tuple[List, List]:
+        pass
+
+    @abstractmethod
+    def count(self) -> int:
+        pass
+
+    @abstractmethod
+    def get_batch(self, offset: int, limit: int) -> Tuple[List, List, List, List]:
+        pass
+
+    @abstractmethod
+    def add_embeddings(self, ids: List[str], texts: List[str], metadatas: List[Dict], embeddings: List) -> None:
+        pass
+
 class FileManager(ABC):
     @abstractmethod
     def save_file(self, content: bytes, destination: Path) -> Path:
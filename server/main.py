@@ -5,6 +5,7 @@ from pydantic import BaseModel
 from graph import graph
 from typing import List
 from services import create_upload_service
+from context_cache import get_context_cache
 
 app = FastAPI()
 
@@ -27,6 +28,11 @@ async def root():
     return {"message": "Hello World"}
 
 
+@app.get("/context-cache/stats")
+async def context_cache_stats():
+    return get_context_cache().stats()
+
+
 @app.post("/upload")
 async def upload_files(files: List[UploadFile] = File(...), urls: List[str] = Form(...)):
     return await upload_service.process_uploads(files, urls)
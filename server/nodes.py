@@ -5,7 +5,10 @@ from pydantic import BaseModel, Field
 from typing import Literal, List
 from langchain.messages import HumanMessage, AIMessage, SystemMessage
 from langchain.chat_models import init_chat_model
+from langchain_core.runnables import RunnableConfig
 from tools import retriever_tool
+from context_cache import get_context_cache
+from glossary import get_glossary
 
 load_dotenv()
 model = init_chat_model("google_genai:gemini-2.5-flash-lite", temperature=0)
@@ -29,20 +32,7 @@ REWRITE_PROMPT = (
     "\n ------- \n"
     "{question}"
     "\n ------- \n"
-    "IMPORTANT: If the question contains UPPERCASE words or acronyms (like SET, VAT, PAYE, WHT, etc.), "
-    "these are likely tax-related acronyms. Try to expand them to their full form if you know it:\n"
-    "- SET = Statement of Estimated Tax Payable\n"
-    "- VAT = Value Added Tax\n"
-    "- PAYE = Pay As You Earn\n"
-    "- WHT = Withholding Tax\n"
-    "- APIT = Advanced Personal Income Tax\n"
-    "- ESC = Economic Service Charge\n"
-    "- NBT = Nation Building Tax\n"
-    "- SVAT = Simplified Value Added Tax\n"
-    "- TIN = Tax Identification Number\n"
-    "\n"
-    "Include BOTH the acronym AND the full form in your improved question to ensure better search results.\n"
-    "For example: 'SET exemptions' should become 'Statement of Estimated Tax Payable (SET) exemptions'\n\n"
+    "{glossary}"
     "Formulate an improved question:"
 )
 
@@ -187,9 +177,17 @@ def generate_query_or_respond(state: State):
 
 def grade_documents(
     state: State,
+    config: RunnableConfig,
 ) -> Literal["generate_answer", "rewrite_question"]:
-    """Determine whether the retrieved documents are relevant to the question."""
+    """Determine whether the retrieved documents are relevant to the question.
+    Context served from the thread's cache was already graded, so it goes straight to generation.
+    """
     messages = state["messages"]
+    artifact = getattr(messages[-1], "artifact", None) or {}
+    if artifact.get("cache_hit"):
+        return "generate_answer"
+
+    thread_id = config.get("configurable", {}).get("thread_id")
     question = next((m.content for m in reversed(messages) if hasattr(m, 'type') and m.type == 'human'), messages[0].content)
     context = messages[-1].content
 
@@ -204,8 +202,10 @@ def grade_documents(
     score = response.binary_score
 
     if score == "yes":
+        get_context_cache().commit(thread_id)
         return "generate_answer"
     else:
+        get_context_cache().discard(thread_id)
         return "rewrite_question"
     
 
@@ -214,7 +214,8 @@ def rewrite_question(state: State):
     messages = state["messages"]
     question = next((m.content for m in reversed(messages) if hasattr(m, 'type') and m.type == 'human'), messages[0].content)
     
-    prompt = REWRITE_PROMPT.format(question=question)
+    # Acronym instructions are only sent when the question contains an uppercase word
+    prompt = REWRITE_PROMPT.format(question=question, glossary=get_glossary().prompt_section(question))
     response = model.invoke([{"role": "user", "content": prompt}])
     
     # Return as AIMessage so generate_query_or_respond can detect this is from internal node
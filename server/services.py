@@ -1,19 +1,26 @@
 from pathlib import Path
+import json
+import os
 import shutil
 from typing import Dict, List
+import numpy as np
 from interfaces import DocumentLoader, TextSplitter, VectorStore, FileManager
 from factories import DocumentLoaderFactory, TextSplitterFactory, VectorStoreFactory
+from glossary import AcronymGlossary, get_glossary
+from context_cache import get_context_cache
 
 class DocumentIngestionService:
     def __init__(
         self,
         document_loader: DocumentLoader,
         text_splitter: TextSplitter,
-        vector_store: VectorStore
+        vector_store: VectorStore,
+        glossary: AcronymGlossary = None
     ):
         self.document_loader = document_loader
         self.text_splitter = text_splitter
         self.vector_store = vector_store
+        self.glossary = glossary
     
     def ingest_documents(self, file_paths_with_urls: Dict[str, str]) -> int:
         all_docs = []
@@ -21,8 +28,13 @@ class DocumentIngestionService:
             docs = self.document_loader.load(file_path, source_url)
             all_docs.extend(docs)
         
+        if self.glossary:
+            self.glossary.mine_documents(all_docs)
+        
         doc_splits = self.text_splitter.split_documents(all_docs)
         self.vector_store.add_documents(doc_splits)
+        # Cached thread context skips grading, so it must not outlive a corpus change
+        get_context_cache().clear()
         
         return len(doc_splits)
 
@@ -86,12 +98,145 @@ class UploadService:
         
         return file_paths_with_urls
 
+SNAPSHOT_FORMAT_VERSION = 1
+
+class SnapshotService:
+    """
+    Exports the collection to a versioned snapshot directory and loads it back.
+
+    A snapshot holds `manifest.json`, `chunks.jsonl` (id, text and metadata per
+    line, in row order) and `embeddings.npy`, a contiguous float32/float16
+    matrix that can be opened with `np.load(..., mmap_mode="r")`. Restoring
+    reuses the stored embeddings, so no embedding calls are made. Snapshots are
+    always imported into a vector store, no backend serves them in place.
+    """
+
+    MANIFEST_FILE = "manifest.json"
+    CHUNKS_FILE = "chunks.jsonl"
+    EMBEDDINGS_FILE = "embeddings.npy"
+
+    def __init__(self, vector_store: VectorStore, batch_size: int = 1000):
+        self.vector_store = vector_store
+        self.batch_size = batch_size
+    
+    def export_snapshot(self, destination: str, dtype: str = "float32") -> Dict:
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported snapshot dtype: {dtype}")
+        
+        destination = Path(destination)
+        destination.mkdir(parents=True, exist_ok=True)
+        total = self.vector_store.count()
+        
+        embeddings = None
+        written = 0
+        with open(destination / self.CHUNKS_FILE, "w", encoding="utf-8") as chunks_file:
+            while written < total:
+                ids, texts, metadatas, batch_embeddings = self.vector_store.get_batch(written, self.batch_size)
+                if not ids:
+                    break
+                batch_embeddings = np.asarray(batch_embeddings, dtype=dtype)
+                
+                if embeddings is None:
+                    embeddings = np.lib.format.open_memmap(
+                        destination / self.EMBEDDINGS_FILE, mode="w+", dtype=dtype,
+                        shape=(total, batch_embeddings.shape[1])
+                    )
+                embeddings[written:written + len(ids)] = batch_embeddings
+                
+                for chunk_id, text, metadata in zip(ids, texts, metadatas):
+                    chunks_file.write(json.dumps({"id": chunk_id, "text": text, "metadata": metadata or {}}) + "\n")
+                written += len(ids)
+        
+        if embeddings is None:
+            np.save(destination / self.EMBEDDINGS_FILE, np.empty((0, 0), dtype=dtype))
+            dimension = 0
+        else:
+            embeddings.flush()
+            dimension = embeddings.shape[1]
+            del embeddings
+        
+        manifest = {
+            "format_version": SNAPSHOT_FORMAT_VERSION,
+            "embedding_model": getattr(self.vector_store, "embedding_model", None),
+            "dtype": dtype,
+            "count": written,
+            "dimension": dimension,
+        }
+        with open(destination / self.MANIFEST_FILE, "w", encoding="utf-8") as manifest_file:
+            json.dump(manifest, manifest_file, indent=2)
+        
+        return {"message": f"Exported {written} chunks to {destination}.", "chunks": written}
+    
+    def import_snapshot(self, source: str) -> Dict:
+        source = Path(source)
+        manifest = self.load_manifest(source)
+        
+        embeddings = np.load(source / self.EMBEDDINGS_FILE, mmap_mode="r")
+        if embeddings.shape[0] != manifest["count"]:
+            raise ValueError(f"Snapshot embeddings have {embeddings.shape[0]} rows, manifest says {manifest['count']}")
+        
+        loaded = 0
+        try:
+            with open(source / self.CHUNKS_FILE, "r", encoding="utf-8") as chunks_file:
+                batch = []
+                for line in chunks_file:
+                    batch.append(json.loads(line))
+                    if len(batch) == self.batch_size:
+                        self._add_batch(batch, embeddings[loaded:loaded + len(batch)])
+                        loaded += len(batch)
+                        batch = []
+                if batch:
+                    self._add_batch(batch, embeddings[loaded:loaded + len(batch)])
+                    loaded += len(batch)
+        finally:
+            # Even a partial import changes the corpus under any cached thread context
+            get_context_cache().clear()
+        
+        if loaded != manifest["count"]:
+            raise ValueError(f"Snapshot has {loaded} chunks, manifest says {manifest['count']}")
+        
+        return {"message": f"Imported {loaded} chunks from {source}.", "chunks": loaded}
+    
+    def load_manifest(self, source: Path) -> Dict:
+        with open(Path(source) / self.MANIFEST_FILE, "r", encoding="utf-8") as manifest_file:
+            manifest = json.load(manifest_file)
+        
+        if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format version: {manifest.get('format_version')}")
+        
+        model = getattr(self.vector_store, "embedding_model", None)
+        if manifest.get("embedding_model") and model and manifest["embedding_model"] != model:
+            raise ValueError(
+                f"Snapshot was built with {manifest['embedding_model']}, vector store uses {model}"
+            )
+        return manifest
+    
+    def _add_batch(self, chunks: List[Dict], embeddings: np.ndarray) -> None:
+        self.vector_store.add_embeddings(
+            [chunk["id"] for chunk in chunks],
+            [chunk["text"] for chunk in chunks],
+            [chunk["metadata"] for chunk in chunks],
+            np.asarray(embeddings, dtype=np.float32).tolist()
+        )
+
+VECTOR_STORE_DIRECTORIES = {
+    "chroma": "./chroma_db",
+    "numpy": "./numpy_db",
+}
+
+_vector_stores = {}
+
+def get_vector_store_type() -> str:
+    return os.getenv("VECTOR_STORE_TYPE", "chroma")
+
 def create_ingestion_service() -> DocumentIngestionService:
     document_loader = DocumentLoaderFactory.create_loader("pdf")
     text_splitter = TextSplitterFactory.create_splitter("tiktoken", chunk_size=500, chunk_overlap=75)
-    vector_store = VectorStoreFactory.create_vector_store("chroma", "knowladge_collection", "./chroma_db")
+    vector_store = get_vector_store()
+    # Mining "Full Form (ACR)" definitions from uploaded PDFs is opt-in
+    glossary = get_glossary() if os.getenv("MINE_GLOSSARY", "false").lower() == "true" else None
     
-    return DocumentIngestionService(document_loader, text_splitter, vector_store)
+    return DocumentIngestionService(document_loader, text_splitter, vector_store, glossary)
 
 def create_upload_service() -> UploadService:
     file_manager = LocalFileManager()
@@ -99,5 +244,18 @@ def create_upload_service() -> UploadService:
     
     return UploadService(file_manager, ingestion_service)
 
-def get_vector_store():
-    return VectorStoreFactory.create_vector_store("chroma", "knowladge_collection", "./chroma_db")
+def get_vector_store(store_type: str = None, persist_directory: str = None):
+    # Ingestion and retrieval share one instance so the in-process numpy store sees new chunks
+    store_type = store_type or get_vector_store_type()
+    persist_directory = persist_directory or VECTOR_STORE_DIRECTORIES[store_type]
+    key = (store_type, persist_directory)
+    if key not in _vector_stores:
+        options = {"index_type": os.getenv("NUMPY_INDEX_TYPE", "flat")} if store_type == "numpy" else {}
+        _vector_stores[key] = VectorStoreFactory.create_vector_store(
+            store_type, "knowladge_collection", persist_directory, **options
+        )
+    return _vector_stores[key]
+
+def create_snapshot_service(persist_directory: str = None, store_type: str = None) -> SnapshotService:
+    vector_store = get_vector_store(store_type, persist_directory)
+    return SnapshotService(vector_store)
@@ -0,0 +1,37 @@
+import argparse
+import time
+from dotenv import load_dotenv
+from services import create_snapshot_service
+
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export or import a corpus snapshot of the vector store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    export_parser = subparsers.add_parser("export", help="Export the collection to a snapshot directory")
+    export_parser.add_argument("destination", help="Snapshot directory to write")
+    export_parser.add_argument("--dtype", choices=["float32", "float16"], default="float32")
+    export_parser.add_argument("--store-type", choices=["chroma", "numpy"], default=None)
+    export_parser.add_argument("--persist-directory", default=None)
+    
+    import_parser = subparsers.add_parser("import", help="Load a snapshot directory into the collection")
+    import_parser.add_argument("source", help="Snapshot directory to read")
+    import_parser.add_argument("--store-type", choices=["chroma", "numpy"], default=None)
+    import_parser.add_argument("--persist-directory", default=None)
+    
+    args = parser.parse_args()
+    service = create_snapshot_service(args.persist_directory, args.store_type)
+    
+    start = time.perf_counter()
+    if args.command == "export":
+        result = service.export_snapshot(args.destination, dtype=args.dtype)
+    else:
+        result = service.import_snapshot(args.source)
+    
+    print(f"{result['message']} ({time.perf_counter() - start:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,50 +1,34 @@
 from langchain.tools import tool
+from langchain_core.runnables import RunnableConfig
 from services import get_vector_store
+from context_cache import get_context_cache
+from glossary import get_glossary
+from typing import Dict, Tuple
 import os
-import re
 
-_vector_store = None
-
-# Tax acronyms mapping for query expansion
-TAX_ACRONYMS = {
-    "SET": "Statement of Estimated Tax Payable",
-    "VAT": "Value Added Tax",
-    "PAYE": "Pay As You Earn",
-    "WHT": "Withholding Tax",
-    "APIT": "Advanced Personal Income Tax",
-    "ESC": "Economic Service Charge",
-    "NBT": "Nation Building Tax",
-    "SVAT": "Simplified Value Added Tax",
-    "TIN": "Tax Identification Number",
-    "CIT": "Corporate Income Tax",
-    "PIT": "Personal Income Tax",
-    "IRD": "Inland Revenue Department",
-}
+RETRIEVAL_K = 6
 
 def expand_query_acronyms(query: str) -> str:
     """Expand tax acronyms in the query for better retrieval."""
-    expanded_query = query
+    return get_glossary().expand(query)
+
+def format_document(doc) -> str:
+    """Format a retrieved chunk with its metadata for the LLM context."""
+    source = doc.metadata.get('source', 'N/A')
+    source_url = doc.metadata.get('source_url', '')
+    page_num = doc.metadata.get('page', 'N/A')
     
-    # Find uppercase words that might be acronyms (2-5 chars)
-    for acronym, full_form in TAX_ACRONYMS.items():
-        # Match the acronym as a whole word (case-sensitive for uppercase)
-        pattern = r'\b' + acronym + r'\b'
-        if re.search(pattern, query):
-            # Replace with "full_form (ACRONYM)" for better matching
-            expanded_query = re.sub(pattern, f"{full_form} ({acronym})", expanded_query)
+    if source != 'N/A':
+        source = os.path.splitext(os.path.basename(source))[0]
     
-    return expanded_query
-
-def get_retriever():
-    global _vector_store
-    if _vector_store is None:
-        _vector_store = get_vector_store()
-    return _vector_store.store.as_retriever(search_kwargs={"k": 6})
-
+    if page_num != 'N/A' and isinstance(page_num, int):
+        page_num = page_num + 1
+    
+    return f"Document Content: \n {doc.page_content}\n\n Metadata:\n page: {page_num} \n source: {source} \n source_url: {source_url}\n\n"
 
 
-@tool
-def retrive_documents(query: str) -> str:
+@tool(response_format="content_and_artifact")
+def retrive_documents(query: str, config: RunnableConfig) -> Tuple[str, Dict]:
     """
     Retrieve relevant documents based on the query.
     
@@ -59,27 +43,25 @@ def retrive_documents(query: str) -> str:
     print(f"[Retriever] Original query: {query}")
     print(f"[Retriever] Expanded query: {expanded_query}")
     
-    retriever = get_retriever()
-    docs = retriever.invoke(expanded_query)
+    thread_id = config.get("configurable", {}).get("thread_id")
+    store = get_vector_store()
+    query_embedding = store.embed_query(expanded_query)
 
-    # combine documents with metadata
+    # Follow-ups are often answerable from chunks this thread already retrieved
+    cached_content = get_context_cache().lookup(thread_id, query_embedding)
+    if cached_content is not None:
+        print(f"[Retriever] Context cache hit for thread {thread_id}")
+        return cached_content, {"cache_hit": True}
 
-    retrived_content = ""
+    docs, embeddings = store.search_with_embeddings(query_embedding, k=RETRIEVAL_K)
 
-    for doc in docs:
-        source = doc.metadata.get('source', 'N/A')
-        source_url = doc.metadata.get('source_url', '')
-        page_num = doc.metadata.get('page', 'N/A')
-        
-        if source != 'N/A':
-            source = os.path.splitext(os.path.basename(source))[0]
-        
-        if page_num != 'N/A' and isinstance(page_num, int):
-            page_num = page_num + 1
-        
-        retrived_content += f"Document Content: \n {doc.page_content}\n\n Metadata:\n page: {page_num} \n source: {source} \n source_url: {source_url}\n\n"
+    # combine documents with metadata
+    chunks = [format_document(doc) for doc in docs]
+
+    # Staged until grade_documents accepts them
+    get_context_cache().stage(thread_id, [doc.id for doc in docs], embeddings, chunks)
 
-    return retrived_content
+    return "".join(chunks), {"cache_hit": False}
 
 retriever_tool = retrive_documents
     
\ No newline at end of file